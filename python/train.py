@@ -18,9 +18,12 @@ import librosa
 import scipy.signal
 import resampy
 from typing import Dict, List, Tuple, Optional, Union
-import pickle
-import io
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import base64
+import tempfile
+import time
+import hashlib
 
 # Page configuration - must be first Streamlit command
 st.set_page_config(
@@ -91,6 +94,104 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def _onnx_export_worker(saved_model_dir: str, output_path: str) -> bool:
+    """
+    Convert a SavedModel to ONNX inside a worker process
+    Running out-of-process keeps the Streamlit loop responsive and returns
+    the TF graph + tf2onnx temporaries (including GPU memory) to the OS
+    when the worker exits
+    """
+    import tf2onnx
+    from onnx import helper
+
+    # opset 17 plus the com.microsoft domain lets tf2onnx run its
+    # LayerNormalization fusion passes on the exported graph
+    tf2onnx.convert.from_saved_model(
+        saved_model_dir,
+        opset=17,
+        extra_opset=[helper.make_opsetid("com.microsoft", 1)],
+        output_path=output_path
+    )
+    return True
+
+# Seed for the train/val/test permutation; part of the encoded-data cache
+# key because the cached arrays depend on the split
+_SPLIT_SEED = 42
+
+def _round_up8(n: int) -> int:
+    """
+    Round up to the next multiple of 8: Tensor-Core-friendly and keeps the
+    set of batch shapes (and therefore XLA compilations) small and fixed
+    """
+    return (n + 7) & ~7
+
+def sinusoid_position_encoding(max_len: int, d_model: int) -> np.ndarray:
+    """
+    Fixed sinusoidal position encoding table of shape (max_len, d_model)
+    Computed once at model build time, so the forward pass only does a
+    slice and an add instead of an embedding gather
+    """
+    positions = np.arange(max_len)[:, np.newaxis]
+    dims = np.arange(d_model)[np.newaxis, :]
+    angle_rates = 1.0 / np.power(10000.0, (2 * (dims // 2)) / np.float32(d_model))
+    angles = positions * angle_rates
+    angles[:, 0::2] = np.sin(angles[:, 0::2])
+    angles[:, 1::2] = np.cos(angles[:, 1::2])
+    return angles.astype(np.float32)
+
+class FusedSelfAttention(tf.keras.layers.Layer):
+    """
+    Self-attention block built from a compact einsum chain instead of
+    tf.keras.layers.MultiHeadAttention
+    When the installed TF ships tf.nn.scaled_dot_product_attention (2.16+)
+    the fused kernel is used so the N x N score matrix never round-trips
+    through HBM; otherwise a two-einsum softmax path is used
+    """
+
+    def __init__(self, num_heads: int, key_dim: int, **kwargs):
+        super().__init__(**kwargs)
+        self.num_heads = num_heads
+        self.key_dim = key_dim
+
+    def build(self, input_shape):
+        embed_dim = int(input_shape[-1])
+        # One fused GEMM produces Q, K and V for every head at once, which
+        # keeps Tensor Cores busier than three small separate projections
+        self.qkv_proj = tf.keras.layers.EinsumDense(
+            "bsd,dthk->bsthk",
+            output_shape=(None, 3, self.num_heads, self.key_dim),
+            name="qkv"
+        )
+        self.output_proj = tf.keras.layers.EinsumDense(
+            "bhsk,hkd->bsd",
+            output_shape=(None, embed_dim),
+            bias_axes="d",
+            name="output"
+        )
+        super().build(input_shape)
+
+    def call(self, inputs):
+        # (batch, seq, 3, heads, key_dim) -> (3, batch, heads, seq, key_dim)
+        qkv = tf.transpose(self.qkv_proj(inputs), (2, 0, 3, 1, 4))
+        q, k, v = qkv[0], qkv[1], qkv[2]
+
+        fused_attention = getattr(tf.nn, "scaled_dot_product_attention", None)
+        if fused_attention is not None:
+            context = fused_attention(q, k, v)
+        else:
+            scale = tf.cast(self.key_dim, q.dtype) ** -0.5
+            scores = tf.einsum("bhqd,bhkd->bhqk", q, k) * scale
+            weights = tf.nn.softmax(scores, axis=-1)
+            context = tf.einsum("bhqk,bhkd->bhqd", weights, v)
+
+        # Merge heads and re-project in a single einsum
+        return self.output_proj(context)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({"num_heads": self.num_heads, "key_dim": self.key_dim})
+        return config
+
 class DeepPhonemizer:
     """
     DeepPhonemizer model for grapheme-to-phoneme conversion
@@ -125,26 +226,30 @@ class DeepPhonemizer:
             name="token_embedding"
         )(inputs)
 
-        # Add positional encoding
-        positions = tf.range(start=0, limit=tf.shape(embedding_layer)[1], delta=1)
-        position_embeddings = tf.keras.layers.Embedding(
-            self.config["max_seq_length"],
-            self.config["embedding_dim"],
-            name="position_embedding"
-        )(positions)
+        # Add positional encoding from a fixed sinusoidal table: no per-step
+        # embedding gather and no max_seq_length x embedding_dim parameters
+        pe_const = tf.constant(
+            sinusoid_position_encoding(
+                self.config["max_seq_length"],
+                self.config["embedding_dim"]
+            )
+        )
 
-        embeddings = embedding_layer + position_embeddings
+        embeddings = tf.keras.layers.Lambda(
+            lambda x: x + tf.cast(pe_const[:tf.shape(x)[1], :], x.dtype),
+            name="position_encoding"
+        )(embedding_layer)
         embeddings = tf.keras.layers.Dropout(self.config["dropout_rate"])(embeddings)
 
         # Transformer encoder blocks
         x = embeddings
         for i in range(self.config["num_layers"]):
             # Multi-head attention
-            attention_output = tf.keras.layers.MultiHeadAttention(
+            attention_output = FusedSelfAttention(
                 num_heads=self.config["num_heads"],
                 key_dim=self.config["embedding_dim"] // self.config["num_heads"],
                 name=f"attention_{i}"
-            )(x, x)
+            )(x)
             attention_output = tf.keras.layers.Dropout(self.config["dropout_rate"])(attention_output)
             x = tf.keras.layers.LayerNormalization(epsilon=1e-6)(x + attention_output)
 
@@ -162,7 +267,10 @@ class DeepPhonemizer:
             x = tf.keras.layers.LayerNormalization(epsilon=1e-6)(x + ffn_output)
 
         # Output layer for phoneme prediction
-        outputs = tf.keras.layers.Dense(phoneme_size, activation="softmax", name="phoneme_output")(x)
+        # Softmax runs in FP32 so the loss stays numerically stable under
+        # the mixed precision policy
+        logits = tf.keras.layers.Dense(phoneme_size, name="phoneme_output")(x)
+        outputs = tf.keras.layers.Activation("softmax", dtype="float32", name="phoneme_probs")(logits)
 
         # Create model
         model = tf.keras.Model(inputs=inputs, outputs=outputs, name="deep_phonemizer")
@@ -180,44 +288,77 @@ class DeepPhonemizer:
             tf.keras.layers.Bidirectional(
                 tf.keras.layers.LSTM(128, return_sequences=True, dropout=0.2)
             ),
-            tf.keras.layers.Dense(phoneme_size, activation="softmax")
+            tf.keras.layers.Dense(phoneme_size),
+            tf.keras.layers.Activation("softmax", dtype="float32")
         ], name="lstm_phonemizer")
         return model
 
     def compile_model(self, learning_rate: float = 0.001):
         """
         Compile the model with optimizer and loss function
+        XLA compilation (jit_compile) fuses the attention/FFN/layernorm
+        elementwise chains into single kernels; set DP_JIT=0 to disable
         """
         optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate)
+        if tf.keras.mixed_precision.global_policy().name == "mixed_float16":
+            # Loss scaling keeps small FP16 gradients from flushing to zero
+            optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
+        # XLA cannot compile CudnnRNN, so jitting the LSTM would either
+        # fail or kick it off the fused cuDNN kernel; transformer only
+        use_jit = (self.model_type == "transformer"
+                   and os.environ.get("DP_JIT", "1") != "0")
         self.model.compile(
             optimizer=optimizer,
             loss="sparse_categorical_crossentropy",
-            metrics=["accuracy"]
+            metrics=["accuracy"],
+            jit_compile=use_jit
         )
 
     def export_to_onnx(self, output_path: str):
         """
         Export the trained model to ONNX format for inference
+        Conversion runs in a one-shot worker process that re-loads the
+        SavedModel, so the UI is never blocked by tf2onnx and the worker
+        releases its TF memory on exit
         """
         try:
-            import tf2onnx
-
-            # Define input signature
-            spec = (tf.TensorSpec((None, None), tf.int32, name="input"),)
-
-            # Convert to ONNX
-            model_proto, _ = tf2onnx.convert.from_keras(
-                self.model,
-                input_signature=spec,
-                opset=13,
-                output_path=output_path
-            )
-
-            return True
+            import tf2onnx  # noqa: F401 - fail fast before spawning the worker
         except ImportError:
             st.error("tf2onnx not installed. Install with: pip install tf2onnx")
             return False
 
+        # Clone the model with Dropout replaced by identity: dropout is a
+        # no-op at inference but would still land as ops in the ONNX graph
+        def _strip_dropout(layer):
+            if isinstance(layer, tf.keras.layers.Dropout):
+                return tf.keras.layers.Activation("linear", name=layer.name)
+            return layer.__class__.from_config(layer.get_config())
+
+        inference_model = tf.keras.models.clone_model(self.model, clone_function=_strip_dropout)
+        inference_model.set_weights(self.model.get_weights())
+
+        with tempfile.TemporaryDirectory() as saved_model_dir:
+            inference_model.save(saved_model_dir)
+
+            # Spawn a fresh interpreter for the worker: forking the
+            # multithreaded Streamlit server after TF has initialized CUDA
+            # would hand the child a broken copy of the CUDA context
+            with ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                future = executor.submit(_onnx_export_worker, saved_model_dir, output_path)
+
+                # Poll so Streamlit stays interactive while the worker runs
+                while not future.done():
+                    time.sleep(0.2)
+
+                try:
+                    return future.result()
+                except Exception as e:
+                    st.error(f"ONNX export failed: {e}")
+                    return False
+
 class DatasetManager:
     """
     Manages training data for the phonemizer
@@ -234,43 +375,101 @@ class DatasetManager:
     @staticmethod
     def prepare_training_data(
         dictionary: Dict[str, str],
+        batch_size: int = 32,
         test_split: float = 0.1,
-        val_split: float = 0.1
-    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        val_split: float = 0.1,
+        cache_dir: Optional[str] = None
+    ) -> Tuple[tf.data.Dataset, tf.data.Dataset, tf.data.Dataset, Dict[str, int], Dict[str, int]]:
         """
         Prepare training, validation, and test datasets from dictionary
+        Returns batched tf.data pipelines so host-side batch prep overlaps
+        with device compute, plus the char/phoneme index mappings so callers
+        do not have to rebuild the vocabularies
         """
-        # Convert dictionary to lists
-        words = list(dictionary.keys())
-        phonemes = list(dictionary.values())
-
-        # Create character and phoneme vocabularies
-        char_vocab = sorted(set(''.join(words)))
-        phoneme_vocab = sorted(set(' '.join(phonemes).split()))
-
-        # Create mappings
-        char_to_idx = {char: idx + 1 for idx, char in enumerate(char_vocab)}  # 0 reserved for padding
-        phoneme_to_idx = {ph: idx + 1 for idx, ph in enumerate(phoneme_vocab)}
-
-        # Encode data
-        X = []
-        y = []
-
-        for word, phoneme_seq in zip(words, phonemes):
-            # Encode word
-            word_encoded = [char_to_idx.get(char, 0) for char in word]
-            # Encode phonemes
-            phoneme_encoded = [phoneme_to_idx.get(ph, 0) for ph in phoneme_seq.split()]
-
-            X.append(word_encoded)
-            y.append(phoneme_encoded)
-
-        # Pad sequences
-        max_word_len = max(len(seq) for seq in X)
-        max_phoneme_len = max(len(seq) for seq in y)
-
-        X = tf.keras.preprocessing.sequence.pad_sequences(X, maxlen=max_word_len, padding='post')
-        y = tf.keras.preprocessing.sequence.pad_sequences(y, maxlen=max_phoneme_len, padding='post')
+        # Encoding (codepoint lookup, pandas token map, padding and the
+        # split permutation) is the expensive part of data prep, so its
+        # products are persisted under the caller's cache key (dictionary
+        # bytes + splits + seed) and reloaded wholesale on repeat runs
+        encoded_cache = Path(cache_dir) / 'encoded.npz' if cache_dir else None
+
+        if encoded_cache is not None and encoded_cache.exists():
+            cached = np.load(encoded_cache)
+            char_vocab = cached['char_vocab'].tolist()
+            phoneme_vocab = cached['phoneme_vocab'].tolist()
+            char_to_idx = {char: idx + 1 for idx, char in enumerate(char_vocab)}
+            phoneme_to_idx = {ph: idx + 1 for idx, ph in enumerate(phoneme_vocab)}
+
+            word_lengths = cached['word_lengths']
+            phoneme_lengths = cached['phoneme_lengths']
+            X_seqs = np.split(cached['char_ids'], np.cumsum(word_lengths)[:-1])
+            y_seqs = np.split(cached['phoneme_ids'], np.cumsum(phoneme_lengths)[:-1])
+            X, y, indices = cached['X'], cached['y'], cached['indices']
+        else:
+            # Convert dictionary to lists
+            words = list(dictionary.keys())
+            phonemes = list(dictionary.values())
+
+            # Create character and phoneme vocabularies
+            char_vocab = sorted(set(''.join(words)))
+            phoneme_vocab = sorted(set(' '.join(phonemes).split()))
+
+            # Create mappings
+            char_to_idx = {char: idx + 1 for idx, char in enumerate(char_vocab)}  # 0 reserved for padding
+            phoneme_to_idx = {ph: idx + 1 for idx, ph in enumerate(phoneme_vocab)}
+
+            # Encode data in bulk: characters go through a codepoint lookup
+            # table and phoneme tokens through a C-level pandas hash map, then
+            # the flat id arrays are split back into per-sequence views
+            char_lut = np.zeros(max(map(ord, char_vocab)) + 1, dtype=np.int32)
+            for char, idx in char_to_idx.items():
+                char_lut[ord(char)] = idx
+
+            all_chars = np.frombuffer(''.join(words).encode('utf-32-le'), dtype=np.uint32)
+            word_lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+            char_ids = char_lut[all_chars]
+            X = np.split(char_ids, np.cumsum(word_lengths)[:-1])
+
+            phoneme_lengths = np.fromiter(
+                (len(seq.split()) for seq in phonemes), dtype=np.int64, count=len(phonemes)
+            )
+            all_tokens = ' '.join(phonemes).split()
+            phoneme_ids = pd.Series(all_tokens).map(phoneme_to_idx).fillna(0).to_numpy(dtype=np.int32)
+            y = np.split(phoneme_ids, np.cumsum(phoneme_lengths)[:-1])
+
+            # Keep the ragged per-sequence views for the bucketed train pipeline
+            X_seqs, y_seqs = X, y
+
+            # Pad into pre-allocated buffers; pad_sequences re-allocates and
+            # copies sequence by sequence in pure Python
+            # Lengths round up to a multiple of 8 so val/test batches keep one
+            # Tensor-Core-aligned static shape instead of an arbitrary max
+            max_word_len = _round_up8(int(word_lengths.max()))
+            max_phoneme_len = _round_up8(int(phoneme_lengths.max()))
+
+            X_padded = np.zeros((len(X), max_word_len), dtype=np.int32)
+            y_padded = np.zeros((len(y), max_phoneme_len), dtype=np.int32)
+            for i, (word_ids, phoneme_seq_ids) in enumerate(zip(X, y)):
+                X_padded[i, :len(word_ids)] = word_ids
+                y_padded[i, :len(phoneme_seq_ids)] = phoneme_seq_ids
+            X, y = X_padded, y_padded
+
+            # One seed-stable permutation applied once: the padded tensors are
+            # reordered with a single gather and the splits below are contiguous
+            # views instead of three fancy-indexed copies
+            indices = np.random.default_rng(_SPLIT_SEED).permutation(len(X))
+            X = X[indices]
+            y = y[indices]
+
+            if encoded_cache is not None:
+                encoded_cache.parent.mkdir(parents=True, exist_ok=True)
+                np.savez(
+                    encoded_cache,
+                    char_vocab=np.array(char_vocab),
+                    phoneme_vocab=np.array(phoneme_vocab),
+                    char_ids=char_ids, word_lengths=word_lengths,
+                    phoneme_ids=phoneme_ids, phoneme_lengths=phoneme_lengths,
+                    X=X, y=y, indices=indices
+                )
 
         # Split data
         n_samples = len(X)
@@ -278,18 +477,147 @@ class DatasetManager:
         n_val = int(n_samples * val_split)
         n_train = n_samples - n_test - n_val
 
-        # Shuffle and split
-        indices = np.random.permutation(n_samples)
-
+        # Train indices stay in dictionary order for the ragged sequences
         train_idx = indices[:n_train]
-        val_idx = indices[n_train:n_train + n_val]
-        test_idx = indices[n_train + n_val:]
 
-        X_train, y_train = X[train_idx], y[train_idx]
-        X_val, y_val = X[val_idx], y[val_idx]
-        X_test, y_test = X[test_idx], y[test_idx]
+        X_val, y_val = X[n_train:n_train + n_val], y[n_train:n_train + n_val]
+        X_test, y_test = X[n_train + n_val:], y[n_train + n_val:]
+
+        # Build tf.data pipelines: cache the encoded tensors, reshuffle the
+        # training set each epoch, and prefetch so the next batch is staged
+        # while the current one trains
+        #
+        # Training sequences stay ragged and are bucketed by word length so
+        # attention cost (O(L^2)) tracks the bucket length rather than the
+        # global max; shorter buckets also get proportionally larger batches
+        def train_generator():
+            for i in train_idx:
+                yield X_seqs[i], y_seqs[i]
+
+        bucket_boundaries = [8, 16, 24, 32, 48, 64, 96]
+        bucket_batch_sizes = [
+            batch_size * 4, batch_size * 2, batch_size * 2,
+            batch_size, batch_size, batch_size,
+            max(1, batch_size // 2), max(1, batch_size // 2)
+        ]
+
+        train_pipeline = tf.data.Dataset.from_generator(
+            train_generator,
+            output_signature=(
+                tf.TensorSpec(shape=(None,), dtype=tf.int32),
+                tf.TensorSpec(shape=(None,), dtype=tf.int32)
+            )
+        )
+        train_ds = (
+            train_pipeline
+            .cache()
+            .shuffle(max(1, len(train_idx)), reshuffle_each_iteration=True)
+            .bucket_by_sequence_length(
+                element_length_func=lambda word_ids, phoneme_ids: tf.shape(word_ids)[0],
+                bucket_boundaries=bucket_boundaries,
+                bucket_batch_sizes=bucket_batch_sizes,
+                padded_shapes=([None], [None]),
+                drop_remainder=True
+            )
+            # Pad each bucketed batch out to a multiple of 8 so every batch
+            # shape comes from a small fixed set and XLA compiles each one
+            # exactly once
+            .map(
+                lambda word_ids, phoneme_ids: (
+                    tf.pad(word_ids, [[0, 0], [0, -tf.shape(word_ids)[1] % 8]]),
+                    tf.pad(phoneme_ids, [[0, 0], [0, -tf.shape(phoneme_ids)[1] % 8]])
+                ),
+                num_parallel_calls=tf.data.AUTOTUNE
+            )
+            .prefetch(tf.data.AUTOTUNE)
+        )
+        val_ds = (
+            tf.data.Dataset.from_tensor_slices((X_val, y_val))
+            .batch(batch_size)
+            .cache()
+            .prefetch(tf.data.AUTOTUNE)
+        )
+        test_ds = (
+            tf.data.Dataset.from_tensor_slices((X_test, y_test))
+            .batch(batch_size)
+            .cache()
+            .prefetch(tf.data.AUTOTUNE)
+        )
+
+        return train_ds, val_ds, test_ds, char_to_idx, phoneme_to_idx
 
-        return X_train, y_train, X_val, y_val, X_test, y_test
+class StreamlitCallback(tf.keras.callbacks.Callback):
+    """
+    Keras callback that streams per-epoch metrics into Streamlit widgets
+    Lets training run as a single model.fit call instead of one fit per epoch
+    """
+
+    def __init__(self, progress_bar, status_text, metric_placeholders, total_epochs):
+        super().__init__()
+        self.progress_bar = progress_bar
+        self.status_text = status_text
+        self.epoch_metric, self.loss_metric, self.acc_metric, self.val_loss_metric = metric_placeholders
+        self.total_epochs = total_epochs
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+
+        # Update progress
+        progress = (epoch + 1) / self.total_epochs
+        self.progress_bar.progress(progress)
+        self.status_text.text(f"Training epoch {epoch + 1}/{self.total_epochs}")
+
+        # Update live metrics with smooth animation
+        self.epoch_metric.metric("Epoch", f"{epoch + 1}/{self.total_epochs}")
+        self.loss_metric.metric("Loss", f"{logs.get('loss', 0.0):.4f}")
+        self.acc_metric.metric("Accuracy", f"{logs.get('accuracy', 0.0):.2%}")
+        self.val_loss_metric.metric("Val Loss", f"{logs.get('val_loss', 0.0):.4f}")
+
+@st.cache_data
+def load_dict(dict_bytes: bytes) -> Dict[str, str]:
+    """
+    Parse the uploaded phoneme dictionary once per file content
+    Keyed on the raw bytes so swapping files invalidates the cache
+    """
+    return json.loads(dict_bytes)
+
+@st.cache_data
+def dataset_stats(dict_bytes: bytes) -> Dict:
+    """
+    Collect every statistic the Dataset tab displays in one fused pass
+    Cached on the uploaded file bytes so Streamlit reruns (every widget
+    interaction) cost a dict lookup instead of four O(N) scans
+    """
+    dictionary = json.loads(dict_bytes)
+
+    chars = set()
+    phoneme_tokens = set()
+    word_lengths = []
+    phoneme_lengths = []
+
+    for word, phoneme_seq in dictionary.items():
+        chars.update(word)
+        tokens = phoneme_seq.split()
+        phoneme_tokens.update(tokens)
+        word_lengths.append(len(word))
+        phoneme_lengths.append(len(tokens))
+
+    # Pre-bin the length histograms so the Dataset tab renders them with
+    # client-side charts instead of rebuilding matplotlib figures per rerun
+    word_counts, word_edges = np.histogram(word_lengths, bins=20)
+    phoneme_counts, phoneme_edges = np.histogram(phoneme_lengths, bins=20)
+
+    return {
+        'total_words': len(dictionary),
+        'unique_chars': len(chars),
+        'unique_phonemes': len(phoneme_tokens),
+        'word_length_hist': pd.DataFrame(
+            {'frequency': word_counts}, index=np.round(word_edges[:-1], 1)
+        ),
+        'phoneme_length_hist': pd.DataFrame(
+            {'frequency': phoneme_counts}, index=np.round(phoneme_edges[:-1], 1)
+        )
+    }
 
 # Initialize session state
 if 'model' not in st.session_state:
@@ -359,7 +687,7 @@ def main():
             )
 
             if uploaded_file:
-                dictionary = json.load(uploaded_file)
+                dictionary = load_dict(uploaded_file.getvalue())
                 st.success(f"✅ Loaded {len(dictionary)} entries")
 
                 # Display sample entries
@@ -375,46 +703,33 @@ def main():
             if uploaded_file:
                 st.markdown("#### Dataset Statistics")
 
-                # Calculate statistics with nice cards
-                total_words = len(dictionary)
-                unique_chars = len(set(''.join(dictionary.keys())))
-                unique_phonemes = len(set(' '.join(dictionary.values()).split()))
+                # Single cached pass over the dictionary
+                stats = dataset_stats(uploaded_file.getvalue())
 
                 # Display metrics in cards
                 metric_col1, metric_col2, metric_col3 = st.columns(3)
 
                 with metric_col1:
-                    st.metric("Total Words", f"{total_words:,}")
+                    st.metric("Total Words", f"{stats['total_words']:,}")
 
                 with metric_col2:
-                    st.metric("Unique Characters", unique_chars)
+                    st.metric("Unique Characters", stats['unique_chars'])
 
                 with metric_col3:
-                    st.metric("Unique Phonemes", unique_phonemes)
+                    st.metric("Unique Phonemes", stats['unique_phonemes'])
 
-                # Distribution plot
+                # Distribution plot - pre-binned, rendered client-side
                 st.markdown("#### Length Distribution")
 
-                word_lengths = [len(word) for word in dictionary.keys()]
-                phoneme_lengths = [len(ph.split()) for ph in dictionary.values()]
+                hist_col1, hist_col2 = st.columns(2)
 
-                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
+                with hist_col1:
+                    st.markdown("**Word Length (characters)**")
+                    st.bar_chart(stats['word_length_hist'])
 
-                # Word length distribution
-                ax1.hist(word_lengths, bins=20, alpha=0.7, color='#667eea', edgecolor='black')
-                ax1.set_xlabel("Word Length (characters)")
-                ax1.set_ylabel("Frequency")
-                ax1.set_title("Word Length Distribution")
-                ax1.grid(True, alpha=0.3)
-
-                # Phoneme length distribution
-                ax2.hist(phoneme_lengths, bins=20, alpha=0.7, color='#764ba2', edgecolor='black')
-                ax2.set_xlabel("Phoneme Sequence Length")
-                ax2.set_ylabel("Frequency")
-                ax2.set_title("Phoneme Length Distribution")
-                ax2.grid(True, alpha=0.3)
-
-                st.pyplot(fig)
+                with hist_col2:
+                    st.markdown("**Phoneme Sequence Length**")
+                    st.bar_chart(stats['phoneme_length_hist'])
 
     with tab2:
         st.markdown("### Model Training")
@@ -432,18 +747,31 @@ def main():
                     # Prepare data
                     with st.spinner("Preparing dataset..."):
                         dataset_manager = DatasetManager()
-                        X_train, y_train, X_val, y_val, X_test, y_test = dataset_manager.prepare_training_data(
+                        # Key the encoded-data cache on everything that
+                        # changes its contents, not just the dictionary: a
+                        # stale entry would silently replay an old split
+                        cache_key = hashlib.sha256(
+                            uploaded_file.getvalue()
+                            + f"|test={test_split}|val={val_split}|seed={_SPLIT_SEED}".encode()
+                        ).hexdigest()[:16]
+                        train_ds, val_ds, test_ds, char_to_idx, phoneme_to_idx = dataset_manager.prepare_training_data(
                             dictionary,
+                            batch_size=batch_size,
                             test_split=test_split/100,
-                            val_split=val_split/100
+                            val_split=val_split/100,
+                            cache_dir=os.path.join("cache", cache_key)
                         )
 
-                    # Calculate vocabulary sizes
-                    vocab_size = len(set(''.join(dictionary.keys()))) + 1  # +1 for padding
-                    phoneme_size = len(set(' '.join(dictionary.values()).split())) + 1
+                    # Vocabulary sizes come from the encoder mappings
+                    vocab_size = len(char_to_idx) + 1  # +1 for padding
+                    phoneme_size = len(phoneme_to_idx) + 1
 
                     # Build model
                     with st.spinner(f"Building {model_type} model..."):
+                        # FP16 compute with FP32 variables: halves activation
+                        # bandwidth and enables Tensor Cores on Volta+ GPUs
+                        tf.keras.mixed_precision.set_global_policy("mixed_float16")
+
                         phonemizer = DeepPhonemizer(model_type.lower())
 
                         if model_type == "Transformer":
@@ -478,34 +806,27 @@ def main():
                         acc_metric = metric_cols[2].empty()
                         val_loss_metric = metric_cols[3].empty()
 
-                        # Training loop with live updates
-                        history = {'loss': [], 'accuracy': [], 'val_loss': [], 'val_accuracy': []}
-
-                        for epoch in range(epochs):
-                            # Update progress
-                            progress = (epoch + 1) / epochs
-                            progress_bar.progress(progress)
-                            status_text.text(f"Training epoch {epoch + 1}/{epochs}")
-
-                            # Train for one epoch
-                            hist = phonemizer.model.fit(
-                                X_train, y_train,
-                                batch_size=batch_size,
-                                epochs=1,
-                                validation_data=(X_val, y_val),
-                                verbose=0
-                            )
-
-                            # Update history
-                            for key in history:
-                                if key in hist.history:
-                                    history[key].append(hist.history[key][0])
-
-                            # Update live metrics with smooth animation
-                            epoch_metric.metric("Epoch", f"{epoch + 1}/{epochs}")
-                            loss_metric.metric("Loss", f"{history['loss'][-1]:.4f}")
-                            acc_metric.metric("Accuracy", f"{history['accuracy'][-1]:.2%}")
-                            val_loss_metric.metric("Val Loss", f"{history['val_loss'][-1]:.4f}")
+                        # Single fit call with live updates pushed from the callback
+                        streamlit_callback = StreamlitCallback(
+                            progress_bar,
+                            status_text,
+                            (epoch_metric, loss_metric, acc_metric, val_loss_metric),
+                            epochs
+                        )
+
+                        hist = phonemizer.model.fit(
+                            train_ds,
+                            epochs=epochs,
+                            validation_data=val_ds,
+                            callbacks=[streamlit_callback],
+                            verbose=0
+                        )
+
+                        # Collect history from the single training run
+                        history = {
+                            key: hist.history.get(key, [])
+                            for key in ('loss', 'accuracy', 'val_loss', 'val_accuracy')
+                        }
 
                         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -532,17 +853,22 @@ def main():
 
                         with col2:
                             if st.button("📥 Download Model Weights"):
-                                # Serialize model weights
-                                weights = phonemizer.model.get_weights()
-                                buffer = io.BytesIO()
-                                pickle.dump(weights, buffer)
-                                buffer.seek(0)
+                                # Stream weights to HDF5 in one pass instead
+                                # of pickling a second in-memory copy
+                                tmp = tempfile.NamedTemporaryFile(suffix='.h5', delete=False)
+                                tmp.close()
+                                try:
+                                    phonemizer.model.save_weights(tmp.name)
+                                    with open(tmp.name, 'rb') as f:
+                                        weights_bytes = f.read()
+                                finally:
+                                    os.unlink(tmp.name)
 
                                 # Create download button
                                 st.download_button(
                                     label="Download Weights",
-                                    data=buffer.getvalue(),
-                                    file_name=f"weights_{model_type.lower()}.pkl",
+                                    data=weights_bytes,
+                                    file_name=f"weights_{model_type.lower()}.h5",
                                     mime="application/octet-stream"
                                 )
 
@@ -12,12 +12,17 @@ Date: 2024
 import json
 import sys
 import os
+import re
+import functools
+import hashlib
+import inspect
 import argparse
 import logging
 from pathlib import Path
 from typing import List, Tuple, Optional
-import random
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
 
 # Add DeepPhonemizer to path
 sys.path.append(str(Path(__file__).parent.parent / '.github' / 'DeepPhonemizer'))
@@ -27,6 +32,26 @@ import torch.nn as nn
 import numpy as np
 from tqdm import tqdm
 
+# orjson parses UTF-8 JSON in C; fall back to stdlib json if missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson streams key/value pairs so large dictionaries never have to be
+# materialized as one giant dict before processing
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# pyarrow keeps the loaded corpus in contiguous string buffers instead of
+# one ~200-byte tuple of Python objects per row
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
 # Import DeepPhonemizer modules
 from dp.preprocess import preprocess
 from dp.train import train
@@ -43,6 +68,44 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Whitespace normalization for phoneme strings: compiled once, and cached
+# because short function words repeat heavily across the dictionary
+_WS = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=None)
+def _clean_phonemes_cached(phonemes: str) -> str:
+    return _WS.sub(' ', phonemes).strip()
+
+
+# Latin case map for str.translate, covering ASCII A-Z plus the full-width
+# forms U+FF21-FF3A that Latin loanwords usually take in Japanese text;
+# everything else is untouched by lowercasing, so skip the full
+# Unicode/locale machinery of str.lower
+_ASCII_LOWER = {c: c + 0x20 for c in range(0x41, 0x5B)}
+_ASCII_LOWER.update({c: c + 0x20 for c in range(0xFF21, 0xFF3B)})
+
+
+def _augment_variants(lang: str, text: str, phonemes: str):
+    """
+    Yield a sample plus its augmentation variants
+    Module-level so CPython caches the code object and augment_data can
+    flatten samples through one chain.from_iterable pass
+    """
+    yield (lang, text, phonemes)
+
+    # Lowercase version if different (C-level table translate)
+    text_lower = text.translate(_ASCII_LOWER)
+    if text_lower != text:
+        yield (lang, text_lower, phonemes)
+
+    # Different spacing for compounds; a real implementation would split at
+    # word boundaries via MeCab
+    if ' ' not in text and len(text) > 4:
+        mid = len(text) // 2
+        yield (lang, text[:mid] + ' ' + text[mid:], phonemes)
+
+
 class JapaneseDataProcessor:
     """
     Process Japanese text-phoneme pairs for training
@@ -58,51 +121,99 @@ class JapaneseDataProcessor:
         """
         self.dictionary_path = dictionary_path
         self.lexicon_path = lexicon_path
-        self.data = []
+        # Columnar (SoA) storage; the language column is the constant 'ja'
+        # so only text and phoneme columns are kept, as Arrow string arrays
+        # when pyarrow is installed
+        self.texts = []
+        self.phonemes = []
         self.char_set = set()
         self.phoneme_set = set()
 
-    def load_data(self) -> List[Tuple[str, str, str]]:
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def load_data(self) -> int:
         """
         Load and process Japanese phoneme dictionary
 
         Returns:
-            List of (language, text, phonemes) tuples
+            Number of text-phoneme pairs loaded
         """
         logger.info(f"Loading dictionary from {self.dictionary_path}")
 
-        # Load main dictionary
-        with open(self.dictionary_path, 'r', encoding='utf-8') as f:
-            phoneme_dict = json.load(f)
-
-        # Load additional lexicon if provided
-        if self.lexicon_path and os.path.exists(self.lexicon_path):
+        has_lexicon = bool(self.lexicon_path and os.path.exists(self.lexicon_path))
+        if has_lexicon:
             logger.info(f"Loading additional lexicon from {self.lexicon_path}")
-            with open(self.lexicon_path, 'r', encoding='utf-8') as f:
-                additional = json.load(f)
-                phoneme_dict.update(additional)
 
-        # Process entries
-        for word, phonemes in phoneme_dict.items():
-            # Skip entries that are too short or too long
-            if len(word) < 1 or len(word) > 50:
-                continue
-
-            # Clean phoneme string
-            phonemes_clean = self._clean_phonemes(phonemes)
-
-            # Add to dataset
-            self.data.append(('ja', word, phonemes_clean))
+        if ijson is not None:
+            # Stream key/value pairs straight off the file so the raw JSON
+            # dict never sits in memory next to the processed data
+            def _stream(path):
+                with open(path, 'rb') as f:
+                    yield from ijson.kvitems(f, '')
+
+            if has_lexicon:
+                # The lexicon is small, so parse it in full and let its
+                # entries shadow streamed dictionary words - the same
+                # override semantics as dict.update on the full-parse path
+                with open(self.lexicon_path, 'rb') as f:
+                    raw = f.read()
+                lexicon = orjson.loads(raw) if orjson else json.loads(raw)
+                pairs = chain(
+                    (pair for pair in _stream(self.dictionary_path) if pair[0] not in lexicon),
+                    lexicon.items()
+                )
+            else:
+                pairs = _stream(self.dictionary_path)
+        else:
+            # Fall back to parsing in full (orjson when installed)
+            with open(self.dictionary_path, 'rb') as f:
+                raw = f.read()
+            phoneme_dict = orjson.loads(raw) if orjson else json.loads(raw)
+
+            if has_lexicon:
+                with open(self.lexicon_path, 'rb') as f:
+                    raw = f.read()
+                phoneme_dict.update(orjson.loads(raw) if orjson else json.loads(raw))
+
+            pairs = phoneme_dict.items()
+
+        # Filter and clean entries in one comprehension, then build the
+        # symbol sets with single C-level join/split passes instead of one
+        # set.update per entry
+        clean = self._clean_phonemes
+        items = [
+            (word, clean(phonemes))
+            for word, phonemes in pairs
+            if 1 <= len(word) <= 50
+        ]
+
+        texts = [word for word, _ in items]
+        phoneme_strs = [phonemes for _, phonemes in items]
+        if pa is not None:
+            # Two contiguous Arrow buffers instead of a tuple per row
+            self.texts = pa.array(texts)
+            self.phonemes = pa.array(phoneme_strs)
+        else:
+            self.texts = texts
+            self.phonemes = phoneme_strs
+
+        # Deduplicate symbols in C via np.unique: characters as utf-32
+        # codepoints, phoneme tokens as a fixed-width string array; the
+        # Python-level set is only built over the small unique result
+        all_chars = np.frombuffer(
+            ''.join(word for word, _ in items).encode('utf-32-le'), dtype=np.uint32
+        )
+        self.char_set = {chr(c) for c in np.unique(all_chars).tolist()}
 
-            # Collect character and phoneme sets
-            self.char_set.update(word)
-            self.phoneme_set.update(phonemes_clean.split())
+        all_tokens = ' '.join(phonemes for _, phonemes in items).split()
+        self.phoneme_set = set(np.unique(np.asarray(all_tokens)).tolist()) if all_tokens else set()
 
-        logger.info(f"Loaded {len(self.data)} text-phoneme pairs")
+        logger.info(f"Loaded {len(self)} text-phoneme pairs")
         logger.info(f"Unique characters: {len(self.char_set)}")
         logger.info(f"Unique phonemes: {len(self.phoneme_set)}")
 
-        return self.data
+        return len(self)
 
     def _clean_phonemes(self, phonemes: str) -> str:
         """
@@ -114,36 +225,52 @@ class JapaneseDataProcessor:
         Returns:
             Cleaned phoneme string
         """
-        # Remove extra whitespace
-        phonemes = ' '.join(phonemes.split())
-
         # Remove tone markers if needed (keep for Japanese prosody)
         # phonemes = phonemes.replace('ː', '')  # Keep length markers for Japanese
 
-        return phonemes
+        # Whitespace collapse runs in the C regex engine, memoized across
+        # the many duplicate phoneme strings in the dictionary
+        return _clean_phonemes_cached(phonemes)
 
-    def split_data(self, train_ratio: float = 0.8, val_ratio: float = 0.1) -> Tuple[List, List, List]:
+    def split_data(self, train_ratio: float = 0.8, val_ratio: float = 0.1,
+                   seed: int = 42) -> Tuple[List, List, List]:
         """
         Split data into train/validation/test sets
 
         Args:
             train_ratio: Ratio for training set
             val_ratio: Ratio for validation set
+            seed: Shuffle seed (matches the training config seed)
 
         Returns:
             Tuple of (train_data, val_data, test_data)
         """
-        # Shuffle data
-        random.shuffle(self.data)
+        # Shuffle via a C-level permutation; random.shuffle is a pure-Python
+        # Fisher-Yates loop, and seeding keeps the split reproducible
+        idx = np.random.default_rng(seed).permutation(len(self))
+
+        # Gather the shuffled columns (zero-copy slicing on the Arrow side)
+        # and materialize (lang, text, phonemes) tuples only here, at the
+        # boundary where DeepPhonemizer expects row tuples
+        if pa is not None and isinstance(self.texts, pa.Array):
+            order = pa.array(idx)
+            texts = self.texts.take(order).to_pylist()
+            phoneme_strs = self.phonemes.take(order).to_pylist()
+        else:
+            idx_list = idx.tolist()
+            texts = [self.texts[i] for i in idx_list]
+            phoneme_strs = [self.phonemes[i] for i in idx_list]
+
+        shuffled = [('ja', text, phonemes) for text, phonemes in zip(texts, phoneme_strs)]
 
         # Calculate split points
-        n_train = int(len(self.data) * train_ratio)
-        n_val = int(len(self.data) * val_ratio)
+        n_train = int(len(shuffled) * train_ratio)
+        n_val = int(len(shuffled) * val_ratio)
 
         # Split data
-        train_data = self.data[:n_train]
-        val_data = self.data[n_train:n_train + n_val]
-        test_data = self.data[n_train + n_val:]
+        train_data = shuffled[:n_train]
+        val_data = shuffled[n_train:n_train + n_val]
+        test_data = shuffled[n_train + n_val:]
 
         logger.info(f"Data split - Train: {len(train_data)}, Val: {len(val_data)}, Test: {len(test_data)}")
 
@@ -159,24 +286,21 @@ class JapaneseDataProcessor:
         Returns:
             Augmented data
         """
-        augmented = []
-
-        for lang, text, phonemes in data:
-            # Add original
-            augmented.append((lang, text, phonemes))
-
-            # Add lowercase version if different
-            text_lower = text.lower()
-            if text_lower != text:
-                augmented.append((lang, text_lower, phonemes))
-
-            # Add with different spacing for compounds
-            if ' ' not in text and len(text) > 4:
-                # Try to split at likely word boundaries
-                # This is simplified - real implementation would use MeCab
-                mid = len(text) // 2
-                text_spaced = text[:mid] + ' ' + text[mid:]
-                augmented.append((lang, text_spaced, phonemes))
+        # Flatten each sample's variants in one pass; list() over the
+        # chained generators uses CPython's append fast path instead of a
+        # per-iteration branch-and-append loop
+        augmented = list(chain.from_iterable(
+            _augment_variants(*sample) for sample in data
+        ))
+
+        # Order-preserving O(N) dedupe via dict.fromkeys; duplicates would
+        # otherwise be written to disk and re-deduplicated downstream by
+        # preprocess at higher cost
+        n_raw = len(augmented)
+        augmented = list(dict.fromkeys(augmented))
+        if len(augmented) < n_raw:
+            n_dupes = n_raw - len(augmented)
+            logger.info(f"Dropped {n_dupes} duplicate augmented samples ({n_dupes / n_raw:.1%})")
 
         logger.info(f"Augmented data from {len(data)} to {len(augmented)} samples")
         return augmented
@@ -236,6 +360,16 @@ def create_config(output_dir: str, model_type: str = 'forward') -> str:
             'n_val': 500
         },
 
+        # DataLoader tuning - read by the DataLoader injection in
+        # train_model; prefetch_factor beyond 4 hits diminishing returns
+        # from worker IPC serialization cost
+        'dataloader': {
+            'num_workers': min(8, (os.cpu_count() or 2) // 2),
+            'persistent_workers': True,
+            'prefetch_factor': 4,
+            'pin_memory': True
+        },
+
         # Paths
         'paths': {
             'checkpoint_dir': f'{output_dir}/checkpoints',
@@ -253,15 +387,40 @@ def create_config(output_dir: str, model_type: str = 'forward') -> str:
     }
 
     # Save config
-    config_path = os.path.join(output_dir, f'{model_type}_config.yaml')
+    config_path = Path(output_dir) / f'{model_type}_config.yaml'
 
-    # Convert to YAML format
+    # Convert to YAML format; emit through the libyaml C dumper when PyYAML
+    # was built with it, falling back to the pure-Python emitter otherwise
     import yaml
+    try:
+        dumper = yaml.CSafeDumper
+    except AttributeError:
+        dumper = yaml.SafeDumper
     with open(config_path, 'w', encoding='utf-8') as f:
-        yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+        yaml.dump(config, f, Dumper=dumper, default_flow_style=False, allow_unicode=True)
 
     logger.info(f"Created config file: {config_path}")
-    return config_path
+    return str(config_path)
+
+
+# Cap on the number of lines formatted into one writelines payload
+_DUMP_CHUNK = 65536
+
+
+def _dump_samples(path: str, rows: List[Tuple[str, str, str]]):
+    """
+    Write (lang, text, phonemes) rows to a tab-separated file
+
+    Rows are formatted in bulk and written via writelines, so the
+    interpreter is entered once per 64k-line block instead of once per row;
+    chunking caps the transient line-list size on very large splits
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, len(rows), _DUMP_CHUNK):
+            f.writelines([
+                f"{lang}\t{text}\t{phonemes}\n"
+                for lang, text, phonemes in rows[start:start + _DUMP_CHUNK]
+            ])
 
 
 def prepare_data_files(train_data: List, val_data: List, test_data: List, output_dir: str):
@@ -274,28 +433,86 @@ def prepare_data_files(train_data: List, val_data: List, test_data: List, output
         test_data: Test samples
         output_dir: Output directory
     """
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Write train data
-    train_file = os.path.join(output_dir, 'train_data.txt')
-    with open(train_file, 'w', encoding='utf-8') as f:
-        for lang, text, phonemes in train_data:
-            f.write(f"{lang}\t{text}\t{phonemes}\n")
-    logger.info(f"Wrote {len(train_data)} training samples to {train_file}")
-
-    # Write validation data
-    val_file = os.path.join(output_dir, 'val_data.txt')
-    with open(val_file, 'w', encoding='utf-8') as f:
-        for lang, text, phonemes in val_data:
-            f.write(f"{lang}\t{text}\t{phonemes}\n")
-    logger.info(f"Wrote {len(val_data)} validation samples to {val_file}")
-
-    # Write test data
-    test_file = os.path.join(output_dir, 'test_data.txt')
-    with open(test_file, 'w', encoding='utf-8') as f:
-        for lang, text, phonemes in test_data:
-            f.write(f"{lang}\t{text}\t{phonemes}\n")
-    logger.info(f"Wrote {len(test_data)} test samples to {test_file}")
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    splits = [
+        ('train_data.txt', 'training', train_data),
+        ('val_data.txt', 'validation', val_data),
+        ('test_data.txt', 'test', test_data),
+    ]
+
+    # The three files are independent streams, so write them concurrently:
+    # threads release the GIL inside os.write, letting one split format
+    # while another flushes to disk
+    with ThreadPoolExecutor(max_workers=len(splits)) as executor:
+        futures = {
+            executor.submit(_dump_samples, str(out / filename), rows):
+                (filename, label, rows)
+            for filename, label, rows in splits
+        }
+        for future in as_completed(futures):
+            filename, label, rows = futures[future]
+            future.result()
+            logger.info(f"Wrote {len(rows)} {label} samples to {out / filename}")
+
+
+def _preprocess_cache_key(config_file: str, train_data: List, val_data: List) -> str:
+    """
+    Hash the config file and the train/val samples; identical inputs mean
+    preprocess() would regenerate byte-identical output
+    """
+    h = hashlib.sha256()
+    h.update(Path(config_file).read_bytes())
+    for lang, text, phonemes in chain(train_data, val_data):
+        h.update(f"{lang}\t{text}\t{phonemes}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _enable_pinned_dataloaders(settings: Optional[dict] = None):
+    """
+    Inject pinned-memory and worker defaults into the DataLoaders built
+    inside DeepPhonemizer's training loop
+
+    Pinned (page-locked) host buffers let H2D copies run as async DMA and
+    overlap with compute instead of staging through pageable memory, and
+    persistent workers keep CPU-side preprocessing hidden behind GPU
+    compute. DeepPhonemizer does not expose these knobs, so wrap
+    DataLoader.__init__ and fill in defaults (typically the config's
+    'dataloader' block) only where the caller left them unset.
+    """
+    if not torch.cuda.is_available():
+        return
+
+    defaults = settings or {}
+
+    original_init = torch.utils.data.DataLoader.__init__
+    if getattr(original_init, '_jp_tts_pinned', False):
+        return
+
+    def patched_init(self, *args, **kwargs):
+        kwargs.setdefault('pin_memory', defaults.get('pin_memory', True))
+        if 'num_workers' in defaults:
+            kwargs.setdefault('num_workers', defaults['num_workers'])
+        # Worker-only knobs are invalid on a zero-worker loader
+        if kwargs.get('num_workers', 0):
+            kwargs.setdefault('persistent_workers', defaults.get('persistent_workers', True))
+            kwargs.setdefault('prefetch_factor', defaults.get('prefetch_factor', 2))
+        original_init(self, *args, **kwargs)
+
+    patched_init._jp_tts_pinned = True
+    torch.utils.data.DataLoader.__init__ = patched_init
+
+
+def _distributed_train(rank: int, num_gpus: int, config_file: str,
+                       dataloader_settings: Optional[dict] = None):
+    """
+    Per-rank entry point for multi-GPU training
+    Spawned workers re-import this module with an unpatched DataLoader, so
+    the pinned-memory tuning has to be re-applied inside each rank
+    """
+    _enable_pinned_dataloaders(dataloader_settings)
+    train(rank=rank, num_gpus=num_gpus, config_file=config_file)
 
 
 def train_model(config_file: str, train_data: List, val_data: List, use_gpu: bool = True):
@@ -310,23 +527,49 @@ def train_model(config_file: str, train_data: List, val_data: List, use_gpu: boo
     """
     logger.info("Starting model training...")
 
-    # Preprocess data
-    preprocess(
-        config_file=config_file,
-        train_data=train_data,
-        val_data=val_data,
-        deduplicate_train_data=True
-    )
+    # Preprocess data, skipping the full tokenization/indexing pass when
+    # config and samples are unchanged from a previous run (the common case
+    # during hyperparameter sweeps)
+    preprocessed_dir = Path(config_file).parent / 'preprocessed'
+    preprocessed_dir.mkdir(parents=True, exist_ok=True)
+    marker = preprocessed_dir / f".done_{_preprocess_cache_key(config_file, train_data, val_data)}"
+
+    if marker.exists():
+        logger.info("Preprocessed data is up to date, skipping preprocess")
+    else:
+        preprocess(
+            config_file=config_file,
+            train_data=train_data,
+            val_data=val_data,
+            deduplicate_train_data=True
+        )
+        marker.touch()
 
     # Check GPU availability
     num_gpus = torch.cuda.device_count() if use_gpu else 0
     logger.info(f"Training with {num_gpus} GPU(s)")
 
+    # Overlap H2D transfers and CPU preprocessing with compute on GPU runs,
+    # using the tuning block from the training config
+    dataloader_settings = None
+    if num_gpus > 0:
+        import yaml
+        with open(config_file, 'r', encoding='utf-8') as f:
+            cfg = yaml.safe_load(f) or {}
+        dataloader_settings = cfg.get('dataloader')
+        _enable_pinned_dataloaders(dataloader_settings)
+
     # Train model
     if num_gpus > 1:
-        # Multi-GPU training
+        # Multi-GPU training; the forkserver start method shares page-cached
+        # modules copy-on-write instead of re-importing the Python world in
+        # every spawned child (a torchrun launch is not possible here:
+        # dp.train is a vendored library module with no CLI entry point and
+        # is only importable through this script's sys.path setup)
         import torch.multiprocessing as mp
-        mp.spawn(train, nprocs=num_gpus, args=(num_gpus, config_file))
+        mp.start_processes(_distributed_train,
+                           args=(num_gpus, config_file, dataloader_settings),
+                           nprocs=num_gpus, start_method='forkserver')
     else:
         # Single GPU or CPU training
         train(rank=0, num_gpus=num_gpus, config_file=config_file)
@@ -334,7 +577,19 @@ def train_model(config_file: str, train_data: List, val_data: List, use_gpu: boo
     logger.info("Training completed!")
 
 
-def export_to_onnx(checkpoint_path: str, output_path: str, model_type: str = 'forward'):
+@functools.lru_cache(maxsize=None)
+def _dummy_export_input(seq_len: int) -> torch.Tensor:
+    """
+    Zero-valued trace input, cached per shape
+    Zeros skip RNG initialization (and its CUDA warm-up path) and index 0
+    always satisfies embedding bounds; the exporter only cares about the
+    shape and dtype
+    """
+    return torch.zeros((1, seq_len), dtype=torch.int64)
+
+
+def export_to_onnx(checkpoint_path: str, output_path: str, model_type: str = 'forward',
+                   quantize: str = 'none'):
     """
     Export trained model to ONNX format
 
@@ -342,11 +597,19 @@ def export_to_onnx(checkpoint_path: str, output_path: str, model_type: str = 'fo
         checkpoint_path: Path to model checkpoint
         output_path: Output ONNX file path
         model_type: Model type ('forward' or 'autoregressive')
+        quantize: Post-export quantization ('none', 'fp16' or 'int8')
     """
     logger.info(f"Exporting model from {checkpoint_path} to {output_path}")
 
-    # Load checkpoint
-    checkpoint = torch.load(checkpoint_path, map_location='cpu')
+    # Load checkpoint; mmap keeps tensor storages on disk until they are
+    # touched instead of materializing the whole state dict up front
+    # (weights_only stays off because the checkpoint carries its config)
+    try:
+        checkpoint = torch.load(checkpoint_path, map_location='cpu',
+                                mmap=True, weights_only=False)
+    except TypeError:
+        # Older torch without the mmap/weights_only kwargs
+        checkpoint = torch.load(checkpoint_path, map_location='cpu')
     config = checkpoint.get('config', {})
 
     # Create model
@@ -371,44 +634,128 @@ def export_to_onnx(checkpoint_path: str, output_path: str, model_type: str = 'fo
             dropout=0
         )
 
-    # Load weights
-    model.load_state_dict(checkpoint['model'])
+    # Load weights; assign=True adopts the mmap'd tensors directly rather
+    # than copying them into the freshly initialized parameters
+    try:
+        model.load_state_dict(checkpoint['model'], assign=True)
+    except TypeError:
+        model.load_state_dict(checkpoint['model'])
     model.eval()
 
-    # Create dummy input for tracing
-    batch_size = 1
-    seq_len = 50
-    dummy_input = torch.randint(0, 100, (batch_size, seq_len))
-
-    # Export to ONNX
-    torch.onnx.export(
-        model,
-        dummy_input,
-        output_path,
-        export_params=True,
-        opset_version=14,
-        do_constant_folding=True,
-        input_names=['input'],
-        output_names=['output'],
-        dynamic_axes={
-            'input': {0: 'batch_size', 1: 'sequence'},
-            'output': {0: 'batch_size', 1: 'sequence'}
-        }
-    )
+    # Cached zero-valued dummy input for tracing
+    dummy_input = _dummy_export_input(seq_len=50)
+
+    # Trace under inference_mode so no autograd metadata is allocated per
+    # op, and with the fused scaled-dot-product attention kernels enabled
+    # so attention can export as one SDPA node per layer instead of the
+    # matmul/softmax/matmul chain
+    import contextlib
+    sdp_ctx = contextlib.nullcontext()
+    if hasattr(torch.backends, 'cuda') and hasattr(torch.backends.cuda, 'sdp_kernel'):
+        sdp_ctx = torch.backends.cuda.sdp_kernel(enable_flash=True, enable_mem_efficient=True)
+
+    # Export to ONNX, preferring the dynamo/FX exporter (torch >= 2.2):
+    # it emits a graph free of TorchScript artifacts that ONNX Runtime can
+    # fuse far more aggressively than the legacy tracer output
+    with torch.inference_mode(), sdp_ctx:
+        try:
+            from torch.export import Dim
+
+            # dynamic_shapes must be keyed by the model's actual forward
+            # parameter name, which for the DeepPhonemizer transformers is
+            # not 'input'
+            forward_params = [p for p in inspect.signature(model.forward).parameters
+                              if p != 'self']
+            input_arg = forward_params[0] if forward_params else 'input'
+            torch.onnx.export(
+                model,
+                (dummy_input,),
+                output_path,
+                dynamo=True,
+                opset_version=18,
+                input_names=['input'],
+                output_names=['output'],
+                dynamic_shapes={input_arg: {0: Dim('batch_size'), 1: Dim('sequence')}}
+            )
+        except Exception as e:
+            logger.warning(f"Dynamo export failed ({e}), falling back to the legacy tracer")
+            # Legacy tracer-based exporter
+            torch.onnx.export(
+                model,
+                dummy_input,
+                output_path,
+                export_params=True,
+                opset_version=17,
+                do_constant_folding=True,
+                training=torch.onnx.TrainingMode.EVAL,
+                input_names=['input'],
+                output_names=['output'],
+                dynamic_axes={
+                    'input': {0: 'batch_size', 1: 'sequence'},
+                    'output': {0: 'batch_size', 1: 'sequence'}
+                }
+            )
 
     logger.info(f"Model exported to {output_path}")
 
-    # Verify ONNX model
+    # Fold constants and drop identity ops from the exported graph
     try:
         import onnx
+        import onnxoptimizer
+
         onnx_model = onnx.load(output_path)
-        onnx.checker.check_model(onnx_model)
+        onnx_model = onnxoptimizer.optimize(onnx_model, [
+            'eliminate_identity',
+            'eliminate_nop_transpose',
+            'fuse_matmul_add_bias_into_gemm'
+        ])
+        onnx.save(onnx_model, output_path)
+        logger.info("Applied post-export graph optimization passes")
+    except ImportError:
+        logger.info("onnxoptimizer not installed, skipping graph optimization")
+
+    # Verify ONNX model; passing the path lets the checker stream the file
+    # instead of re-parsing the full protobuf into a ModelProto first (and
+    # is required anyway for models over 2 GB)
+    try:
+        import onnx
+        onnx.checker.check_model(output_path, full_check=True)
         logger.info("ONNX model verification successful!")
     except ImportError:
         logger.warning("ONNX not installed, skipping verification")
     except Exception as e:
         logger.error(f"ONNX model verification failed: {e}")
 
+    # Optional post-export quantization for edge deployment: INT8 MatMul
+    # weights quarter the model size, FP16 halves it
+    if quantize == 'int8':
+        try:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            int8_path = output_path.replace('.onnx', '_int8.onnx')
+            quantize_dynamic(
+                output_path,
+                int8_path,
+                weight_type=QuantType.QInt8,
+                op_types_to_quantize=['MatMul', 'Gemm']
+            )
+            logger.info(f"INT8 quantized model written to {int8_path}")
+        except ImportError:
+            logger.warning("onnxruntime not installed, skipping INT8 quantization")
+    elif quantize == 'fp16':
+        try:
+            import onnx
+            from onnxconverter_common import float16
+
+            fp16_path = output_path.replace('.onnx', '_fp16.onnx')
+            model_fp16 = float16.convert_float_to_float16(
+                onnx.load(output_path), keep_io_types=True
+            )
+            onnx.save(model_fp16, fp16_path)
+            logger.info(f"FP16 model written to {fp16_path}")
+        except ImportError:
+            logger.warning("onnxconverter-common not installed, skipping FP16 conversion")
+
 
 def main():
     """Main training pipeline"""
@@ -466,6 +813,13 @@ def main():
         action='store_true',
         help='Export model to ONNX after training'
     )
+    parser.add_argument(
+        '--quantize',
+        type=str,
+        choices=['none', 'fp16', 'int8'],
+        default='none',
+        help='Quantize the exported ONNX model'
+    )
     parser.add_argument(
         '--use-gpu',
         action='store_true',
@@ -476,11 +830,12 @@ def main():
     args = parser.parse_args()
 
     # Create output directory
-    os.makedirs(args.output_dir, exist_ok=True)
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
     # Load and process data
     processor = JapaneseDataProcessor(args.dictionary, args.lexicon)
-    data = processor.load_data()
+    processor.load_data()
 
     # Split data
     train_data, val_data, test_data = processor.split_data()
@@ -500,15 +855,11 @@ def main():
 
     # Export to ONNX if requested
     if args.export_onnx:
-        checkpoint_path = os.path.join(
-            args.output_dir,
-            'checkpoints',
-            'best_model.pt'
-        )
-        onnx_path = os.path.join(args.output_dir, 'phonemizer.onnx')
+        checkpoint_path = out_dir / 'checkpoints' / 'best_model.pt'
+        onnx_path = out_dir / 'phonemizer.onnx'
 
-        if os.path.exists(checkpoint_path):
-            export_to_onnx(checkpoint_path, onnx_path, args.model_type)
+        if checkpoint_path.exists():
+            export_to_onnx(str(checkpoint_path), str(onnx_path), args.model_type, args.quantize)
         else:
             logger.warning(f"Checkpoint not found at {checkpoint_path}")
 